@@ -1,10 +1,15 @@
 import logging
 import os
+import threading
 
 from flask import Flask, jsonify, request
 from werkzeug.utils import secure_filename
 
-from orchestrator.docker_orchestrator import DockerOrchestrator
+from manager.federation import SwarmPool, get_requested_resources
+from manager.reaper import Reaper
+from orchestrator.docker_orchestrator import DOCKER_CLIENT_TIMEOUT, DockerOrchestrator, create_docker_client, \
+    get_swarm_load
+from orchestrator.orchestrator import Orchestrator
 from utilities import utils
 
 logging.basicConfig(level=logging.INFO)
@@ -16,6 +21,54 @@ mgr = Flask(__name__)
 # Create a directory in a known location to save files to.
 utils.__set_files_dir(mgr.instance_path)
 
+# Keep track of the PGAs this manager deployed, mapping their id to their master host and status.
+# Failed and removed PGAs are kept as tombstones so that the reaper may reclaim their leftovers.
+known_pgas = {}
+known_pgas_lock = threading.Lock()
+
+
+def register_pga(pga_id, master_host):
+    with known_pgas_lock:
+        known_pgas[pga_id] = {"master_host": master_host, "status": "active"}
+
+
+def tombstone_pga(pga_id, status, master_host=None):
+    with known_pgas_lock:
+        if pga_id in known_pgas:
+            known_pgas[pga_id] = utils.merge_dict(known_pgas.get(pga_id), {"status": status})
+        elif master_host:
+            # E.g., a PGA deployed before a restart of the manager that is now being removed explicitly.
+            known_pgas[pga_id] = {"master_host": master_host, "status": status}
+
+
+def forget_pga(pga_id):
+    # Drops the tombstone of a failed or removed PGA once the reaper found none of its resources left.
+    with known_pgas_lock:
+        if known_pgas.get(pga_id, {}).get("status") in ("failed", "removed"):
+            known_pgas.pop(pga_id)
+
+
+def get_known_pgas():
+    with known_pgas_lock:
+        return {pga_id: dict(known_pgas.get(pga_id)) for pga_id in known_pgas}
+
+
+def resolve_master_host(pga_id):
+    # Prefers an explicitly requested master host, otherwise routes to the swarm the PGA was deployed to.
+    master_host = request.args.get("master_host")
+    if not master_host:
+        master_host = get_known_pgas().get(pga_id, {}).get("master_host")
+    if not master_host:
+        raise Exception("No master host provided or known for PGA {}! Aborting request.".format(pga_id))
+    return master_host
+
+
+# Reclaim resources of PGAs that failed to deploy or to be removed.
+reaper = Reaper(get_known_pgas, forget_pga)
+
+# Keep a pool of swarms to distribute PGAs without an explicit master host onto.
+swarm_pool = SwarmPool(lambda orchestrator_name, master_host: get_swarm_load_of(orchestrator_name, master_host))
+
 
 @mgr.route("/status", methods=["GET"])
 def status():
@@ -38,100 +91,133 @@ def create_pga():
     Creates a new Parallel Genetic Algorithm in the cloud.
 
     :arg master_host: the ip address or hostname of the master node.
+        If omitted, the least loaded swarm of the pool is chosen.
     :type master_host: str
 
     :arg orchestrator: the chosen cloud orchestrator.
     :type orchestrator: str
 
-    :return (dict): id [int] and model [str] of new pga
+    :arg publish_ports: whether to publish the runner and fitness cache ports on the ingress network.
+        Always done for swarms registered as remote. Note that the runner endpoints are unauthenticated.
+    :type publish_ports: bool
+
+    :return (dict): id [int], model [str] and master_host [str] of new pga
     """
     # Recognizes the correct orchestrator.
     master_host = request.args.get("master_host")
     orchestrator_name = request.args.get("orchestrator")
     if not orchestrator_name:
         raise Exception("No cloud orchestrator provided! Aborting deployment.")
-    orchestrator = get_orchestrator(orchestrator_name, master_host)
+    reservation_id = None
+    if not master_host:
+        if "config" not in request.files:
+            raise Exception("No PGA configuration provided! Aborting deployment.")
+        requested = get_requested_resources(utils.parse_yaml_stream(request.files["config"].stream))
+        master_host, reservation_id = swarm_pool.select_least_loaded(orchestrator_name, requested)
+    publish_ports = request.args.get("publish_ports", "false").lower() == "true" \
+        or swarm_pool.is_remote(master_host)
+    try:
+        orchestrator = get_orchestrator(orchestrator_name, master_host, publish_ports=publish_ports)
+    except Exception:
+        if reservation_id is not None:
+            swarm_pool.release(reservation_id)
+        raise
     pga_id = orchestrator.pga_id
+    register_pga(pga_id, master_host)
 
     logging.info("Creating new PGA: {}.".format(pga_id))
 
-    # Saves all the files that were uploaded with the request.
-    file_keys = [*request.files]
-    utils.create_pga_subdir(pga_id)
-    files_dir = utils.get_uploaded_files_path(pga_id)
-    file_names = []
-    if "config" not in file_keys:
-        raise Exception("No PGA configuration provided! Aborting deployment.")
-    for file_key in file_keys:
-        file = request.files[file_key]
-        if file_key == "config":
-            file_name = secure_filename("config.yml")
-        elif file_key == "population":
-            file_name = secure_filename("population.yml")
+    try:
+        # Saves all the files that were uploaded with the request.
+        file_keys = [*request.files]
+        utils.create_pga_subdir(pga_id)
+        files_dir = utils.get_uploaded_files_path(pga_id)
+        file_names = []
+        if "config" not in file_keys:
+            raise Exception("No PGA configuration provided! Aborting deployment.")
+        for file_key in file_keys:
+            file = request.files[file_key]
+            if file_key == "config":
+                file_name = secure_filename("config.yml")
+            elif file_key == "population":
+                file_name = secure_filename("population.yml")
+            else:
+                file_name = secure_filename(file.filename)
+            file_names.append(file_name)
+            file.save(os.path.join(files_dir, file_name))
+
+        # Retrieves the configuration and appends the current PGAs id.
+        config_path = os.path.join(files_dir, "config.yml")
+        config_file = open(config_path, mode="a")
+        config_file.write("\npga_id: {id_}\n".format(id_=pga_id))
+        config_file.close()
+        configuration = utils.parse_yaml(config_path)
+
+        # Determines the model to deploy.
+        model = configuration.get("model")
+        if not model:
+            raise Exception("No PGA model provided! Aborting deployment.")
+        if model == "Master-Slave":
+            # Retrieves the configuration details.
+            services = {}
+            services_config = configuration.get("services")
+            for service_key in [*services_config]:
+                service = services_config.get(service_key)
+                services[service.get("name")] = service
+
+            setups = {}
+            images_config = configuration.get("setups")
+            for service_key in [*images_config]:
+                service = images_config.get(service_key)
+                setups[service.get("name")] = service
+
+            operators = {}
+            operators_config = configuration.get("operators")
+            for service_key in [*operators_config]:
+                service = operators_config.get(service_key)
+                operators[service.get("name")] = service
+
+            population = {}
+            population_config = configuration.get("population")
+            for population_key in [*population_config]:
+                population[population_key] = population_config.get(population_key)
+
+            properties = {}
+            properties_config = configuration.get("properties")
+            for property_key in [*properties_config]:
+                properties[property_key] = properties_config.get(property_key)
+
+            fitness_cache = utils.get_fitness_cache_config(configuration)
+
+            # Creates the new PGA.
+            all_services = utils.merge_dict(services, utils.merge_dict(setups, utils.merge_dict(
+                operators, utils.merge_dict(population, properties))))
+            model_dict = construct_model_dict(model, all_services)
+            orchestrator.setup_pga(model_dict=model_dict, services=services, setups=setups, operators=operators,
+                                   population=population, properties=properties, file_names=file_names,
+                                   fitness_cache=fitness_cache)
+            logging.info("Distribute properties:")
+            orchestrator.distribute_properties(properties=properties)
+            logging.info("Initialize properties:")
+            orchestrator.initialize_population(population=population)
+        elif model == "Island":
+            # TODO 204: implement island model
+            raise Exception("Island model not implemented yet. Aborting deployment.")
         else:
-            file_name = secure_filename(file.filename)
-        file_names.append(file_name)
-        file.save(os.path.join(files_dir, file_name))
-
-    # Retrieves the configuration and appends the current PGAs id.
-    config_path = os.path.join(files_dir, "config.yml")
-    config_file = open(config_path, mode="a")
-    config_file.write("\npga_id: {id_}\n".format(id_=pga_id))
-    config_file.close()
-    configuration = utils.parse_yaml(config_path)
-
-    # Determines the model to deploy.
-    model = configuration.get("model")
-    if not model:
-        raise Exception("No PGA model provided! Aborting deployment.")
-    if model == "Master-Slave":
-        # Retrieves the configuration details.
-        services = {}
-        services_config = configuration.get("services")
-        for service_key in [*services_config]:
-            service = services_config.get(service_key)
-            services[service.get("name")] = service
-
-        setups = {}
-        images_config = configuration.get("setups")
-        for service_key in [*images_config]:
-            service = images_config.get(service_key)
-            setups[service.get("name")] = service
-
-        operators = {}
-        operators_config = configuration.get("operators")
-        for service_key in [*operators_config]:
-            service = operators_config.get(service_key)
-            operators[service.get("name")] = service
-
-        population = {}
-        population_config = configuration.get("population")
-        for population_key in [*population_config]:
-            population[population_key] = population_config.get(population_key)
-
-        properties = {}
-        properties_config = configuration.get("properties")
-        for property_key in [*properties_config]:
-            properties[property_key] = properties_config.get(property_key)
-
-        # Creates the new PGA.
-        all_services = utils.merge_dict(services, utils.merge_dict(setups, utils.merge_dict(
-            operators, utils.merge_dict(population, properties))))
-        model_dict = construct_model_dict(model, all_services)
-        orchestrator.setup_pga(model_dict=model_dict, services=services, setups=setups, operators=operators,
-                               population=population, properties=properties, file_names=file_names)
-        logging.info("Distribute properties:")
-        orchestrator.distribute_properties(properties=properties)
-        logging.info("Initialize properties:")
-        orchestrator.initialize_population(population=population)
-    elif model == "Island":
-        raise Exception("Island model not implemented yet. Aborting deployment.")  # TODO 204: implement island model
-    else:
-        raise Exception("Custom model detected.")  # TODO 205: implement for custom models
+            raise Exception("Custom model detected.")  # TODO 205: implement for custom models
+    except Exception:
+        # Marks the PGA as failed so that the reaper reclaims whatever has been deployed so far.
+        tombstone_pga(pga_id, "failed")
+        raise
+    finally:
+        # The deployed services now account for the resources reserved on the chosen swarm.
+        if reservation_id is not None:
+            swarm_pool.release(reservation_id)
 
     return jsonify({
         "id": orchestrator.pga_id,
         "model": model,
+        "master_host": master_host,
         "status": "created"
     })
 
@@ -144,11 +230,15 @@ def start_pga(pga_id):
     :param pga_id: the PGA id of the PGA to be started.
     :type pga_id: int
 
+    :arg master_host: the ip address or hostname of the master node.
+        If omitted, the master the PGA was deployed to is used.
+    :type master_host: str
+
     :arg orchestrator: the chosen cloud orchestrator.
     :type orchestrator: str
     """
     # Recognizes the correct orchestrator.
-    master_host = request.args.get("master_host")
+    master_host = resolve_master_host(pga_id)
     orchestrator_name = request.args.get("orchestrator")
     if not orchestrator_name:
         raise Exception("No cloud orchestrator provided! Aborting deployment.")
@@ -168,30 +258,109 @@ def start_pga(pga_id):
     })
 
 
+@mgr.route("/pga/<int:pga_id>/scale", methods=["PUT"])
+def scale_pga(pga_id):
+    """
+    Scales a component of the PGA identified by the pga_id route param.
+
+    :param pga_id: the PGA id of the PGA to be scaled.
+    :type pga_id: int
+
+    :arg component: the name of the component to scale, e.g., fitness.
+    :type component: str
+
+    :arg scaling: the new number of replicas.
+    :type scaling: int
+
+    :arg orchestrator: the chosen cloud orchestrator.
+    :type orchestrator: str
+    """
+    # Recognizes the correct orchestrator.
+    master_host = resolve_master_host(pga_id)
+    orchestrator_name = request.args.get("orchestrator")
+    if not orchestrator_name:
+        raise Exception("No cloud orchestrator provided! Aborting request.")
+    component = request.args.get("component")
+    scaling = request.args.get("scaling", type=int)
+    if not component or scaling is None:
+        raise Exception("No component or scaling provided! Aborting request.")
+    orchestrator = get_orchestrator(orchestrator_name, master_host, pga_id)
+
+    # Scales the chosen component.
+    service_name = "{name_}{sep_}{id_}".format(
+        name_=component,
+        sep_=Orchestrator.name_separator,
+        id_=orchestrator.pga_id
+    )
+    logging.info("Scaling {name_} to {scaling_} replicas.".format(name_=service_name, scaling_=scaling))
+    orchestrator.scale_component(service_name=service_name, scaling=scaling)
+
+    return jsonify({
+        "id": orchestrator.pga_id,
+        "component": component,
+        "scaling": scaling,
+    })
+
+
+@mgr.route("/pga/<int:pga_id>/cache", methods=["GET"])
+def get_cache_stats(pga_id):
+    """
+    Retrieves the statistics of the fitness cache used by the PGA identified by the pga_id route param.
+
+    :param pga_id: the PGA id of the PGA to report on.
+    :type pga_id: int
+
+    :arg orchestrator: the chosen cloud orchestrator.
+    :type orchestrator: str
+
+    :return (dict): id [int] of the pga and its fitness cache stats, e.g., hits, misses and hit_rate,
+        with status "unavailable" while the cache cannot be reached
+    """
+    # Recognizes the correct orchestrator.
+    master_host = resolve_master_host(pga_id)
+    orchestrator_name = request.args.get("orchestrator")
+    if not orchestrator_name:
+        raise Exception("No cloud orchestrator provided! Aborting request.")
+    orchestrator = get_orchestrator(orchestrator_name, master_host, pga_id)
+
+    cache_stats = orchestrator.get_fitness_cache_stats()
+    if cache_stats is None:
+        logging.info("PGA {} has no fitness cache.".format(orchestrator.pga_id))
+
+    return jsonify({
+        "id": orchestrator.pga_id,
+        "fitness_cache": cache_stats,
+    })
+
+
 @mgr.route("/pga/<int:pga_id>/stop", methods=["PUT"])
 def stop_pga(pga_id):
     # Recognizes the correct orchestrator.
-    master_host = request.args.get("master_host")
+    master_host = resolve_master_host(pga_id)
     orchestrator_name = request.args.get("orchestrator")
     if not orchestrator_name:
         raise Exception("No cloud orchestrator provided! Aborting deployment.")
     orchestrator = get_orchestrator(orchestrator_name, master_host, pga_id)
 
-    # Stops the chosen PGA.
-    logging.info("Terminating PGA {}.".format(orchestrator.pga_id))
-    exit_code = orchestrator.stop_pga()
-    if exit_code != 202:
-        logging.error("Terminating PGA {id_} finished with unexpected exit code: {code_}".format(
-            id_=orchestrator.pga_id,
-            code_=exit_code,
-        ))
-        status_code = "error_{}".format(exit_code)
-    else:
-        status_code = "removed"
+    try:
+        # Stops the chosen PGA.
+        logging.info("Terminating PGA {}.".format(orchestrator.pga_id))
+        exit_code = orchestrator.stop_pga()
+        if exit_code != 202:
+            logging.error("Terminating PGA {id_} finished with unexpected exit code: {code_}".format(
+                id_=orchestrator.pga_id,
+                code_=exit_code,
+            ))
+            status_code = "error_{}".format(exit_code)
+        else:
+            status_code = "removed"
 
-    # Removes the PGA components.
-    logging.info("Removing components of PGA {}.".format(orchestrator.pga_id))
-    orchestrator.remove_pga()
+        # Removes the PGA components.
+        logging.info("Removing components of PGA {}.".format(orchestrator.pga_id))
+        orchestrator.remove_pga()
+    finally:
+        # Marks the PGA as removed so that the reaper reclaims whatever is left behind, even if stopping failed.
+        tombstone_pga(orchestrator.pga_id, "removed", master_host)
 
     return jsonify({
         "id": orchestrator.pga_id,
@@ -199,16 +368,110 @@ def stop_pga(pga_id):
     })
 
 
-def get_orchestrator(orchestrator_name, master_host, pga_id=None):
+@mgr.route("/reaper", methods=["GET"])
+def get_reaper_stats():
+    """
+    Reports the orphaned resources reclaimed by the background reaper.
+
+    Only the leftovers of PGAs this manager process marked as failed or removed are reclaimed.
+    Resource groups left before a restart of the manager, or created by another manager, are unrecognized:
+    they are reported but never removed, and have to be cleaned up manually or by stopping the PGA explicitly.
+
+    :return (dict): number of cycles, reclaimed resources per kind, the most recently reclaimed resources
+        and the unrecognized resource groups per master
+    """
+    return jsonify(reaper.get_stats())
+
+
+@mgr.route("/swarms", methods=["GET"])
+def get_swarms():
+    """
+    Lists the registered swarms together with their load as of the last background refresh.
+
+    :return (list): master_host [str], orchestrator [str], remote [bool], load [dict] and updated [float]
+        of each registered swarm
+    """
+    return jsonify(swarm_pool.get_swarms())
+
+
+@mgr.route("/swarms", methods=["POST"])
+def register_swarm():
+    """
+    Registers a swarm to deploy PGAs onto when no master host is requested.
+
+    The manager reaches runners and fitness caches of its own swarm on the pga-management overlay network.
+    This is not possible for a remote swarm, i.e., one the manager is not part of. Hence, PGAs on a remote swarm
+    publish the runner and fitness cache ports on the swarm's ingress network, and are reached through the
+    master host on these ports.
+    Security note: the published ports are open on every node of the remote swarm. The runner endpoints
+    (e.g., start, stop and properties) are unauthenticated, while the fitness cache requires a password.
+    Restrict access to these ports, e.g., by firewall rules that only admit the manager.
+
+    :arg master_host: the ip address or hostname of the master node.
+    :type master_host: str
+
+    :arg orchestrator: the cloud orchestrator managing the swarm.
+    :type orchestrator: str
+
+    :arg remote: whether the manager is not part of the swarm. Defaults to false.
+    :type remote: bool
+    """
+    master_host = request.args.get("master_host")
+    orchestrator_name = request.args.get("orchestrator")
+    if not master_host or not orchestrator_name:
+        raise Exception("No master host or cloud orchestrator provided! Aborting registration.")
+    remote = request.args.get("remote", "false").lower() == "true"
+    load = get_swarm_load_of(orchestrator_name, master_host)  # ensures the swarm is supported and reachable
+    swarm_pool.register(master_host, orchestrator_name, remote=remote, load=load)
+    reaper.register_master(master_host)
+
+    return jsonify({
+        "master_host": master_host,
+        "orchestrator": orchestrator_name,
+        "remote": remote,
+        "status": "registered",
+    })
+
+
+@mgr.route("/swarms/<string:master_host>", methods=["DELETE"])
+def unregister_swarm(master_host):
+    """
+    Removes a swarm from the pool. PGAs already running on it are still routed to it.
+
+    :param master_host: the ip address or hostname of the master node.
+    :type master_host: str
+    """
+    removed = swarm_pool.unregister(master_host)
+
+    return jsonify({
+        "master_host": master_host,
+        "status": "unregistered" if removed else "unknown",
+    })
+
+
+def get_orchestrator(orchestrator_name, master_host, pga_id=None, publish_ports=False):
+    reaper.register_master(master_host)
     if orchestrator_name == "docker":
-        return DockerOrchestrator(master_host, pga_id)
+        return DockerOrchestrator(master_host, pga_id, publish_ports)
     elif orchestrator_name == "kubernetes":
         logging.error("Kubernetes orchestrator not yet implemented! Falling back to docker orchestrator.")
-        return DockerOrchestrator(master_host, pga_id)  # TODO 202: implement kubernetes orchestrator
+        # TODO 202: implement kubernetes orchestrator
+        return DockerOrchestrator(master_host, pga_id, publish_ports)
     else:
         raise Exception("Unknown orchestrator requested!")
 
 
+def get_swarm_load_of(orchestrator_name, master_host):
+    if orchestrator_name == "docker":
+        docker_client = create_docker_client(host_ip=master_host, host_port=2376, timeout=DOCKER_CLIENT_TIMEOUT)
+        try:
+            return get_swarm_load(docker_client)
+        finally:
+            docker_client.close()
+    else:
+        raise Exception("Swarm pools are not supported for orchestrator {}!".format(orchestrator_name))
+
+
 def construct_model_dict(model, all_services):
     if model == "Master-Slave":
         # init = RUN/(INIT/)FE/RUN
@@ -251,4 +514,6 @@ def construct_model_dict(model, all_services):
 
 
 if __name__ == "__main__":
+    reaper.start()
+    swarm_pool.start()
     mgr.run(host="0.0.0.0")
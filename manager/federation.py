@@ -0,0 +1,165 @@
+import itertools
+import logging
+import threading
+import time
+import traceback
+
+from utilities import utils
+
+POOL_REFRESH_INTERVAL = 30.0  # seconds between two refreshes of the swarm loads
+
+
+def get_requested_resources(configuration):
+    # Sums the reservations of all components of a PGA configuration and finds its largest single replica.
+    components = []
+    for section in ("services", "setups", "operators"):
+        components += [*(configuration.get(section) or {}).values()]
+    cache_config = utils.get_fitness_cache_config(configuration)
+    if cache_config is not None:
+        components.append(utils.merge_dict(cache_config, {"name": "fitness-cache"}))
+
+    requested = {"nano_cpus": 0, "memory": 0, "max_nano_cpus": 0, "max_memory": 0}
+    for component in components:
+        resources_config = component.get("resources") or {}
+        nano_cpus = utils.parse_cpus(resources_config.get("cpu_reservation"), component.get("name")) or 0
+        memory = utils.parse_memory(resources_config.get("memory_reservation"), component.get("name")) or 0
+        replicas = component.get("scaling") or 1
+        requested["nano_cpus"] += nano_cpus * replicas
+        requested["memory"] += memory * replicas
+        requested["max_nano_cpus"] = max(requested.get("max_nano_cpus"), nano_cpus)
+        requested["max_memory"] = max(requested.get("max_memory"), memory)
+    return requested
+
+
+class SwarmPool(threading.Thread):
+    new_reservation_id = itertools.count().__next__
+
+    def __init__(self, get_swarm_load, interval=POOL_REFRESH_INTERVAL):
+        # get_swarm_load(orchestrator_name, master_host) returns the nodes, pga_services, total and free resources
+        # of the given swarm, as well as the free resources per node.
+        # The loads are refreshed in the background, so that placing a PGA does not wait for every swarm.
+        super().__init__(name="pga-swarm-pool", daemon=True)
+        self.get_swarm_load = get_swarm_load
+        self.interval = interval
+
+        self.__stop_event = threading.Event()
+        self.__lock = threading.Lock()
+        self.__swarms = {}
+        self.__reservations = {}
+
+    def run(self):
+        logging.info("Swarm pool refreshing loads every {} seconds.".format(self.interval))
+        while not self.__stop_event.wait(self.interval):
+            self.refresh()
+
+    def stop(self):
+        self.__stop_event.set()
+
+    def register(self, master_host, orchestrator_name, remote=False, load=None):
+        with self.__lock:
+            self.__swarms[master_host] = {
+                "master_host": master_host,
+                "orchestrator": orchestrator_name,
+                "remote": remote,
+                "load": load,
+                "updated": time.time() if load is not None else None,
+            }
+        logging.info("Registered swarm master {host_} ({orch_}).".format(host_=master_host, orch_=orchestrator_name))
+
+    def unregister(self, master_host):
+        with self.__lock:
+            removed = self.__swarms.pop(master_host, None)
+            for reservation_id in [*self.__reservations]:
+                if self.__reservations.get(reservation_id).get("master_host") == master_host:
+                    self.__reservations.pop(reservation_id)
+        if removed is not None:
+            logging.info("Unregistered swarm master {}.".format(master_host))
+        return removed is not None
+
+    def is_remote(self, master_host):
+        with self.__lock:
+            return self.__swarms.get(master_host, {}).get("remote", False)
+
+    def get_swarms(self, orchestrator_name=None):
+        # Lists the registered swarms with their load as of the last refresh.
+        with self.__lock:
+            return [dict(swarm) for swarm in self.__swarms.values()
+                    if orchestrator_name is None or swarm.get("orchestrator") == orchestrator_name]
+
+    def refresh(self):
+        for swarm in self.get_swarms():
+            self.__refresh(swarm)
+
+    def select_least_loaded(self, orchestrator_name, requested):
+        # Picks the reachable swarm that fits the requested resources and keeps the largest share of unreserved
+        # CPU and memory, preferring fewer PGA services on ties. The requested resources are reserved on the
+        # chosen swarm until released, so that concurrent deployments account for each other.
+        swarms = [swarm for swarm in self.get_swarms(orchestrator_name) if swarm.get("load")]
+        with self.__lock:
+            candidates = []
+            for swarm in swarms:
+                master_host = swarm.get("master_host")
+                load = swarm.get("load")
+                reservations = [reservation for reservation in self.__reservations.values()
+                                if reservation.get("master_host") == master_host]
+                free_nano_cpus = load.get("free_nano_cpus") - requested.get("nano_cpus") \
+                    - sum(reservation.get("nano_cpus") for reservation in reservations)
+                free_memory = load.get("free_memory") - requested.get("memory") \
+                    - sum(reservation.get("memory") for reservation in reservations)
+                fits_replica = any(node.get("nano_cpus") >= requested.get("max_nano_cpus")
+                                   and node.get("memory") >= requested.get("max_memory")
+                                   for node in load.get("free_per_node"))
+                if free_nano_cpus < 0 or free_memory < 0 or not fits_replica:
+                    logging.info("Swarm master {} cannot fit the requested resources.".format(master_host))
+                    continue
+
+                cpu_share = free_nano_cpus / load.get("total_nano_cpus") if load.get("total_nano_cpus") else 0
+                memory_share = free_memory / load.get("total_memory") if load.get("total_memory") else 0
+                candidates.append((-min(cpu_share, memory_share), load.get("pga_services"), master_host))
+
+            if not candidates.__len__() > 0:
+                raise Exception("No reachable {} swarm registered that fits the PGA! Aborting deployment.".format(
+                    orchestrator_name
+                ))
+            master_host = min(candidates)[2]
+            reservation_id = SwarmPool.new_reservation_id()
+            self.__reservations[reservation_id] = {
+                "master_host": master_host,
+                "nano_cpus": requested.get("nano_cpus"),
+                "memory": requested.get("memory"),
+            }
+
+        logging.info("Selected swarm master {host_} for requested resources {requested_}.".format(
+            host_=master_host,
+            requested_=requested,
+        ))
+        return master_host, reservation_id
+
+    def release(self, reservation_id):
+        # Releases a reservation once the services of the PGA account for its resources themselves.
+        # It is kept until the next refresh of the swarm load includes these services.
+        with self.__lock:
+            if reservation_id in self.__reservations:
+                self.__reservations.get(reservation_id)["released"] = time.time()
+
+    def __refresh(self, swarm):
+        master_host = swarm.get("master_host")
+        started = time.time()
+        try:
+            load = self.get_swarm_load(swarm.get("orchestrator"), master_host)
+        except Exception:
+            logging.error("Could not retrieve load of swarm {host_}: {trace_}".format(
+                host_=master_host,
+                trace_=traceback.format_exc(),
+            ))
+            load = None
+
+        with self.__lock:
+            if master_host in self.__swarms:
+                self.__swarms.get(master_host).update(load=load, updated=time.time())
+            if load is not None:
+                for reservation_id in [*self.__reservations]:
+                    reservation = self.__reservations.get(reservation_id)
+                    if reservation.get("master_host") == master_host \
+                            and reservation.get("released") is not None and reservation.get("released") <= started:
+                        self.__reservations.pop(reservation_id)
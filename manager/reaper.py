@@ -0,0 +1,107 @@
+import collections
+import logging
+import threading
+import time
+import traceback
+
+from orchestrator.docker_reaper import DockerReaper
+
+REAPER_INTERVAL = 300.0  # seconds between two collection cycles
+REAPER_BATCH_SIZE = 5  # orphaned PGAs reclaimed per swarm and cycle
+REAPER_HISTORY = 100  # reclaimed resources kept for reporting
+
+
+class Reaper(threading.Thread):
+    def __init__(self, get_known_pgas, forget_pga, interval=REAPER_INTERVAL, batch_size=REAPER_BATCH_SIZE):
+        # get_known_pgas returns a dict of the PGAs the manager knows about, mapping pga_id to its master_host
+        # and status. Only the leftovers of "failed" or "removed" PGAs are reclaimed.
+        # forget_pga(pga_id) drops the tombstone of a PGA that has no resources left on any swarm.
+        super().__init__(name="pga-reaper", daemon=True)
+        self.get_known_pgas = get_known_pgas
+        self.forget_pga = forget_pga
+        self.interval = interval
+        self.batch_size = batch_size
+        self.master_hosts = set()
+
+        self.__stop_event = threading.Event()
+        self.__lock = threading.Lock()
+        self.__cycles = 0
+        self.__last_cycle = None
+        self.__totals = {"service": 0, "config": 0, "network": 0}
+        self.__history = collections.deque(maxlen=REAPER_HISTORY)
+        self.__unrecognized = {}
+
+    def register_master(self, master_host):
+        # Adds a swarm master whose PGAcloud resources are to be supervised.
+        if master_host:
+            with self.__lock:
+                self.master_hosts.add(master_host)
+
+    def run(self):
+        logging.info("Reaper started with an interval of {} seconds.".format(self.interval))
+        while not self.__stop_event.wait(self.interval):
+            self.reap()
+
+    def stop(self):
+        self.__stop_event.set()
+
+    def reap(self):
+        # Runs one collection cycle over all supervised swarms.
+        # PGA ids are unique across all swarms, hence they are not filtered by master host.
+        known_pgas = self.get_known_pgas()
+        reclaimable_pga_ids = {pga_id for pga_id in known_pgas
+                               if known_pgas.get(pga_id).get("status") in ("failed", "removed")}
+        active_pga_ids = {pga_id for pga_id in known_pgas if pga_id not in reclaimable_pga_ids}
+        with self.__lock:
+            master_hosts = [*self.master_hosts]
+
+        present_pga_ids = set()
+        all_inspected = True
+        for master_host in master_hosts:
+            docker_reaper = None
+            try:
+                docker_reaper = DockerReaper(master_host)
+                reclaimed, unrecognized, present = docker_reaper.reap(
+                    reclaimable_pga_ids=reclaimable_pga_ids,
+                    active_pga_ids=active_pga_ids,
+                    batch_size=self.batch_size,
+                )
+            except Exception:
+                logging.error("Reaper failed on {host_}: {trace_}".format(
+                    host_=master_host,
+                    trace_=traceback.format_exc(),
+                ))
+                all_inspected = False
+                continue
+            finally:
+                if docker_reaper is not None:
+                    docker_reaper.close()
+            present_pga_ids |= present
+
+            with self.__lock:
+                self.__unrecognized[master_host] = unrecognized
+                for resource in reclaimed:
+                    resource["reclaimed_at"] = time.time()
+                    self.__totals[resource.get("kind")] += 1
+                    self.__history.append(resource)
+
+        # Tombstones are only dropped once every swarm confirmed that nothing of the PGA is left.
+        if all_inspected:
+            for pga_id in reclaimable_pga_ids - present_pga_ids:
+                self.forget_pga(pga_id)
+
+        with self.__lock:
+            self.__cycles += 1
+            self.__last_cycle = time.time()
+
+    def get_stats(self):
+        with self.__lock:
+            return {
+                "cycles": self.__cycles,
+                "last_cycle": self.__last_cycle,
+                "interval": self.interval,
+                "masters": sorted(self.master_hosts),
+                "reclaimed": dict(self.__totals),
+                "recent": [*self.__history],
+                "unrecognized": dict(self.__unrecognized),
+            }
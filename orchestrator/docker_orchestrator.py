@@ -1,6 +1,8 @@
+import hashlib
 import json
 import logging
 import os
+import secrets
 import time
 import traceback
 import warnings
@@ -15,23 +17,53 @@ WAIT_FOR_CONFIRMATION_EXCEEDING = 15.0
 WAIT_FOR_CONFIRMATION_TROUBLED = 30.0
 WAIT_FOR_CONFIRMATION_SLEEP = 2  # seconds
 
+FITNESS_CACHE_IMAGE = "redis:alpine"
+FITNESS_CACHE_MAX_MEMORY = "256M"
+FITNESS_CACHE_POLICY = "allkeys-lru"
+FITNESS_CACHE_TTL = 3600  # seconds
+FITNESS_CACHE_LABEL = "PGAcloud-cache"
+
+DOCKER_CLIENT_TIMEOUT = 10  # seconds; for short-lived clients that only inspect a swarm
+
 
 class DockerOrchestrator(Orchestrator):
-    def __init__(self, master_host, pga_id):
+    def __init__(self, master_host, pga_id, publish_ports=False):
         super().__init__(pga_id)
 
         self.host = master_host
-        self.docker_master_client = self.__create_docker_client(
+        # Runners and fitness caches are only published on the ingress network if the manager cannot reach them on
+        # the management network, i.e., for swarms the manager is not part of.
+        self.publish_ports = publish_ports
+        self.docker_master_client = create_docker_client(
             host_ip=master_host,
             host_port=2376
             # default docker port; Note above https://docs.docker.com/engine/security/https/#secure-by-default
         )
 
 # Common orchestrator functionality.
-    def setup_pga(self, model_dict, services, setups, operators, population, properties, file_names):
-        self.__create_network()
-        configs = self.__create_configs(file_names)
+    def setup_pga(self, model_dict, services, setups, operators, population, properties, file_names,
+                  fitness_cache=None):
         deploy_init = (not population.get("use_initial_population") or properties.get("USE_INIT"))
+        cache_key = None
+        additional_components = []
+        if fitness_cache is not None:
+            cache_key = self.__compute_fitness_cache_key(operators=operators, file_names=file_names)
+            cache_name = self.__get_fitness_cache_name(cache_key)
+            if self.__find_fitness_cache_service(cache_name) is None:
+                additional_components.append(utils.merge_dict(fitness_cache, {"name": cache_name}))
+        self.__verify_cluster_capacity(services=services, setups=setups, operators=operators,
+                                       deploy_initializer=deploy_init, additional_components=additional_components)
+        self.__create_network(cache_key=cache_key)
+        configs = self.__create_configs(file_names)
+        self.fitness_cache = None
+        if cache_key is not None:
+            self.fitness_cache = self.__deploy_fitness_cache(cache_config=fitness_cache, cache_key=cache_key)
+            model_dict["fitness"]["fitness_cache"] = {
+                "host": self.fitness_cache.get("host"),
+                "port": Orchestrator.fitness_cache_port,
+                "ttl": self.fitness_cache.get("ttl"),
+                "password": self.fitness_cache.get("password"),
+            }
         self.__deploy_stack(services=services, setups=setups, operators=operators,
                             configs=configs, model_dict=model_dict, deploy_initializer=deploy_init)
 
@@ -44,18 +76,59 @@ class DockerOrchestrator(Orchestrator):
         if effective_name in ("runner", "manager"):
             warnings.warn("Scaling aborted: Scaling of runner or manager services not permitted!")
         else:
-            found_services = self.docker_master_client.services.list(filters={"name": service_name})
+            # The name filter matches prefixes, hence the exact comparison.
+            found_services = [service for service in self.docker_master_client.services.list(filters={
+                "name": service_name
+            }) if service.name == service_name]
             if not found_services.__len__() > 0:
                 raise Exception("No service {name_} found for scaling!".format(name_=service_name))
             service = found_services[0]
             service.scale(replicas=scaling)
 
+    def get_fitness_cache_stats(self):
+        cache_key = self.__find_fitness_cache_key()
+        if cache_key is None:
+            return None
+        cache_name = self.__get_fitness_cache_name(cache_key)
+        cache_service = self.__find_fitness_cache_service(cache_name)
+        if cache_service is None:
+            return {"key": cache_key, "status": "unavailable"}
+        cache_port = self.__find_published_port(cache_service, Orchestrator.fitness_cache_port)
+        if cache_port is None:
+            # Caches deployed without a published port are only reachable on the management network.
+            stats = self.fetch_cache_stats(cache_host=cache_name,
+                                           password=self.__get_fitness_cache_password(cache_service))
+        else:
+            stats = self.fetch_cache_stats(cache_host=self.host, cache_port=cache_port,
+                                           password=self.__get_fitness_cache_password(cache_service))
+        if stats is None:
+            return {"key": cache_key, "status": "unavailable"}
+        stats["key"] = cache_key
+        stats["status"] = "available"
+        return stats
+
+    def get_runner_address(self):
+        # Prefers the port published on the ingress network, which is reachable through the master host.
+        runner_name = "runner{sep_}{id_}".format(sep_=Orchestrator.name_separator, id_=self.pga_id)
+        runner_services = [service for service in self.docker_master_client.services.list(filters={
+            "name": runner_name
+        }) if service.name == runner_name]
+        if runner_services.__len__() > 0:
+            published_port = self.__find_published_port(runner_services[0], Orchestrator.runner_port)
+            if published_port is not None:
+                return "{host_}:{port_}".format(host_=self.host, port_=published_port)
+        return super().get_runner_address()
+
     def remove_pga(self):
         # Removes the docker services of this PGA.
         pga_filter = {"label": "PGAcloud=PGA-{id_}".format(id_=self.pga_id)}
         current_services = self.docker_master_client.services.list(filters=pga_filter)
+        cache_keys = set()
         if current_services.__len__() > 0:
             for service in current_services:
+                cache_key = service.attrs.get("Spec", {}).get("Labels", {}).get(FITNESS_CACHE_LABEL)
+                if cache_key:
+                    cache_keys.add(cache_key)
                 service.remove()
 
             duration = 0.0
@@ -98,6 +171,9 @@ class DockerOrchestrator(Orchestrator):
         pga_networks = self.docker_master_client.networks.list(filters=pga_filter)
         if pga_networks.__len__() > 0:
             for network in pga_networks:
+                cache_key = (network.attrs.get("Labels") or {}).get(FITNESS_CACHE_LABEL)
+                if cache_key:
+                    cache_keys.add(cache_key)
                 network.remove()
 
             timer = 0
@@ -115,6 +191,10 @@ class DockerOrchestrator(Orchestrator):
         else:
             logging.info("No PGA docker network found that could be removed.")
 
+        # Removes the fitness caches no other PGA is using anymore.
+        for cache_key in cache_keys:
+            self.__remove_fitness_cache_if_unused(cache_key)
+
 # Commands to control the orchestrator.
     def __deploy_stack(self, services, setups, operators, configs, model_dict, deploy_initializer):
         # Creates a service for each component defined in the configuration.
@@ -122,7 +202,8 @@ class DockerOrchestrator(Orchestrator):
         supports = {}
         for support_key in [*services]:
             support = services.get(support_key)
-            new_service = self.__create_docker_service(service_dict=support, network=self.pga_network)
+            new_service = self.__create_docker_service(service_dict=support, network=self.pga_network,
+                                                       supports=supports)
             self.__update_service_with_configs(configs=configs, service_name=new_service.name)
             supports[support.get("name")] = new_service
         # Ensure services are starting up in the background while waiting for them.
@@ -146,17 +227,19 @@ class DockerOrchestrator(Orchestrator):
                     hostname=setup.get("name"),
                     networks=[self.pga_network.name, "pga-management"],
                     labels={"PGAcloud": "PGA-{id_}".format(id_=self.pga_id)},
-                    endpoint_spec={
-                        "Mode": "dnsrr"
-                    },
+                    endpoint_spec=self.__create_endpoint_spec(Orchestrator.runner_port),
+                    resources=self.__create_resources(setup),
+                    **self.__create_placement(setup, supports),
                 )
             elif setup_name == "initializer":
                 if deploy_initializer:
-                    new_service = self.__create_docker_service(service_dict=setup, network=self.pga_network)
+                    new_service = self.__create_docker_service(service_dict=setup, network=self.pga_network,
+                                                               supports=supports)
                 else:
                     continue  # no need to deploy initializer if initial population is provided.
             else:
-                new_service = self.__create_docker_service(service_dict=setup, network=self.pga_network)
+                new_service = self.__create_docker_service(service_dict=setup, network=self.pga_network,
+                                                           supports=supports)
 
             self.scale_component(service_name=new_service.name, scaling=setup.get("scaling"))
             container_config_name = self.__create_container_config(new_service.name, setup_key, model_dict)
@@ -167,7 +250,18 @@ class DockerOrchestrator(Orchestrator):
         # Deploy the genetic operator services.
         for operator_key in [*operators]:
             operator = operators.get(operator_key)
-            new_service = self.__create_docker_service(service_dict=operator, network=self.pga_network)
+            if operator.get("name") == "fitness" and self.fitness_cache:
+                # Attaches the fitness service to its shared cache.
+                new_service = self.__create_docker_service(
+                    service_dict=operator,
+                    network=self.pga_network,
+                    supports=supports,
+                    additional_networks=[self.fitness_cache.get("network")],
+                    additional_labels={FITNESS_CACHE_LABEL: self.fitness_cache.get("key")},
+                )
+            else:
+                new_service = self.__create_docker_service(service_dict=operator, network=self.pga_network,
+                                                           supports=supports)
             self.scale_component(service_name=new_service.name, scaling=operator.get("scaling"))
             container_config_name = self.__create_container_config(new_service.name, operator_key, model_dict)
             self.__update_service_with_configs(configs=configs, service_name=new_service.name,
@@ -184,33 +278,19 @@ class DockerOrchestrator(Orchestrator):
             self.__wait_for_service(service_name=setup.name)
 
 # Commands for docker stuff.
-    def __create_docker_client(self, host_ip, host_port):
-        tls_config = docker.tls.TLSConfig(
-            ca_cert="/run/secrets/SSL_CA_PEM",
-            client_cert=(
-                "/run/secrets/SSL_CERT_PEM",
-                "/run/secrets/SSL_KEY_PEM"
-            ),
-            verify=True
-        )
-        docker_client = docker.DockerClient(
-            base_url="tcp://{host_}:{port_}".format(
-                host_=host_ip,
-                port_=host_port
-            ),
-            tls=tls_config,
-        )
-        return docker_client
-
-    def __create_network(self):
+    def __create_network(self, cache_key=None):
         # Creates a new docker network.
+        # The fitness cache label marks the cache as in use before the fitness service exists.
+        labels = {"PGAcloud": "PGA-{id_}".format(id_=self.pga_id)}
+        if cache_key is not None:
+            labels[FITNESS_CACHE_LABEL] = cache_key
         self.pga_network = self.docker_master_client.networks.create(
             name="pga-overlay-{id_}".format(id_=self.pga_id),
             driver="overlay",
             check_duplicate=True,
             attachable=True,
             scope="swarm",
-            labels={"PGAcloud": "PGA-{id_}".format(id_=self.pga_id)},
+            labels=labels,
         )
 
     def __create_configs(self, file_names):
@@ -259,7 +339,11 @@ class DockerOrchestrator(Orchestrator):
         )
         return config_name
 
-    def __create_docker_service(self, service_dict, network):
+    def __create_docker_service(self, service_dict, network, supports=None, additional_networks=None,
+                                additional_labels=None):
+        labels = {"PGAcloud": "PGA-{id_}".format(id_=self.pga_id)}
+        if additional_labels:
+            labels = utils.merge_dict(labels, additional_labels)
         return self.docker_master_client.services.create(
             image=service_dict.get("image"),
             name="{name_}{sep_}{id_}".format(
@@ -268,13 +352,306 @@ class DockerOrchestrator(Orchestrator):
                 id_=self.pga_id
             ),
             hostname=service_dict.get("name"),
-            networks=[network.name],
-            labels={"PGAcloud": "PGA-{id_}".format(id_=self.pga_id)},
+            networks=[network.name, *(additional_networks or [])],
+            labels=labels,
             endpoint_spec={
                 "Mode": "dnsrr"
             },
+            resources=self.__create_resources(service_dict),
+            **self.__create_placement(service_dict, supports),
         )
 
+    def __create_resources(self, service_dict):
+        # Translates the optional resources block of a component into docker resource reservations and limits.
+        resources_config = service_dict.get("resources")
+        if not resources_config:
+            return None
+        name = service_dict.get("name")
+        return docker.types.Resources(
+            cpu_limit=utils.parse_cpus(resources_config.get("cpu_limit"), name),
+            mem_limit=utils.parse_memory(resources_config.get("memory_limit"), name),
+            cpu_reservation=utils.parse_cpus(resources_config.get("cpu_reservation"), name),
+            mem_reservation=utils.parse_memory(resources_config.get("memory_reservation"), name),
+        )
+
+    def __create_placement(self, service_dict, supports=None):
+        # Translates the optional placement block of a component into docker placement constraints and preferences.
+        placement_config = service_dict.get("placement")
+        if not placement_config:
+            return {}
+
+        constraints = self.__get_constraints(placement_config)
+        colocate_with = placement_config.get("colocate_with")
+        if colocate_with:
+            colocation_node = self.__find_service_node(colocate_with, supports or {})
+            if colocation_node is None:
+                logging.warning("Could not co-locate {name_} with {other_}: no running task found.".format(
+                    name_=service_dict.get("name"),
+                    other_=colocate_with,
+                ))
+            else:
+                constraints.append("node.id=={}".format(colocation_node))
+
+        spread = placement_config.get("spread") or []
+        if isinstance(spread, str):
+            spread = [spread]
+        preferences = [("spread", descriptor) for descriptor in spread]
+
+        placement = {}
+        if constraints:
+            placement["constraints"] = constraints
+        if preferences:
+            placement["preferences"] = preferences
+        return placement
+
+    def __get_constraints(self, placement_config):
+        # Collects the explicit constraints and the required node labels of a placement block.
+        constraints = list(placement_config.get("constraints") or [])
+        node_labels = placement_config.get("node_labels") or {}
+        for label_key in [*node_labels]:
+            constraints.append("node.labels.{key_}=={value_}".format(key_=label_key, value_=node_labels.get(label_key)))
+        return constraints
+
+    def __find_service_node(self, component_name, supports):
+        # Retrieves the node id of a running task of the given component of this PGA.
+        if component_name in supports:
+            service = supports.get(component_name)
+        else:
+            service_name = "{name_}{sep_}{id_}".format(
+                name_=component_name,
+                sep_=Orchestrator.name_separator,
+                id_=self.pga_id
+            )
+            # The name filter matches prefixes, hence the exact comparison.
+            found_services = [service for service in self.docker_master_client.services.list(filters={
+                "name": service_name
+            }) if service.name == service_name]
+            if not found_services.__len__() > 0:
+                return None
+            service = found_services[0]
+
+        for task in service.tasks(filters={"desired-state": "running"}):
+            if task.get("NodeID"):
+                return task.get("NodeID")
+        return None
+
+    def __verify_cluster_capacity(self, services, setups, operators, deploy_initializer, additional_components=None):
+        # Ensures every requested replica fits on a node its placement allows, given the unreserved node resources.
+        components = [component for component in [*services.values(), *setups.values(), *operators.values()]
+                      if component.get("name") != "initializer" or deploy_initializer]
+        components += additional_components or []
+        if not any(component.get("resources") or component.get("placement") for component in components):
+            return  # no reservations or constraints requested, nothing to verify
+
+        nodes = get_node_capacities(self.docker_master_client)
+        placed_nodes = {}
+        # Places the components to co-locate with before the ones following them.
+        for component in sorted(components, key=lambda c: bool((c.get("placement") or {}).get("colocate_with"))):
+            name = component.get("name")
+            resources_config = component.get("resources") or {}
+            placement_config = component.get("placement") or {}
+            nano_cpus = utils.parse_cpus(resources_config.get("cpu_reservation"), name) or 0
+            memory = utils.parse_memory(resources_config.get("memory_reservation"), name) or 0
+            replicas = component.get("scaling") or 1
+
+            constraints = self.__get_constraints(placement_config)
+            eligible_nodes = [node for node in nodes
+                              if all(matches_constraint(node, constraint) for constraint in constraints)]
+            colocate_with = placement_config.get("colocate_with")
+            if colocate_with in placed_nodes:
+                eligible_nodes = [node for node in eligible_nodes if node is placed_nodes.get(colocate_with)]
+            if not eligible_nodes.__len__() > 0:
+                raise Exception("No node satisfies the placement of component {}! Aborting deployment.".format(name))
+
+            for replica in range(replicas):
+                fitting_nodes = [node for node in eligible_nodes
+                                 if node.get("free_nano_cpus") >= nano_cpus and node.get("free_memory") >= memory]
+                if not fitting_nodes.__len__() > 0:
+                    raise Exception("Insufficient cluster capacity for PGA {id_}: replica {replica_} of {replicas_} "
+                                    "of component {name_} requires {cpus_} CPUs and {mem_} bytes on a single "
+                                    "eligible node. Aborting deployment.".format(
+                                        id_=self.pga_id,
+                                        replica_=replica + 1,
+                                        replicas_=replicas,
+                                        name_=name,
+                                        cpus_=nano_cpus / 1e9,
+                                        mem_=memory,
+                                    ))
+                node = max(fitting_nodes, key=lambda n: (n.get("free_nano_cpus"), n.get("free_memory")))
+                node["free_nano_cpus"] -= nano_cpus
+                node["free_memory"] -= memory
+                placed_nodes.setdefault(name, node)
+        logging.info("Cluster capacity verified for PGA {}.".format(self.pga_id))
+
+    def __deploy_fitness_cache(self, cache_config, cache_key):
+        # Deploys the fitness cache for this problem, or reuses it if another PGA already deployed it.
+        cache_name = self.__get_fitness_cache_name(cache_key)
+        cache_labels = {"PGAcloud": "fitness-cache-{key_}".format(key_=cache_key)}
+
+        cache_network = self.__find_fitness_cache_network(cache_name)
+        if cache_network is None:
+            try:
+                cache_network = self.docker_master_client.networks.create(
+                    name=cache_name,
+                    driver="overlay",
+                    check_duplicate=True,
+                    attachable=True,
+                    scope="swarm",
+                    labels=cache_labels,
+                )
+            except docker.errors.APIError:
+                # Another PGA of the same problem may have created it concurrently.
+                cache_network = self.__find_fitness_cache_network(cache_name)
+                if cache_network is None:
+                    raise
+
+        cache_service = self.__find_fitness_cache_service(cache_name)
+        if cache_service is not None:
+            logging.info("Reusing fitness cache {name_} for PGA {id_}.".format(name_=cache_name, id_=self.pga_id))
+        else:
+            logging.info("Creating fitness cache {name_} for PGA {id_}.".format(name_=cache_name, id_=self.pga_id))
+            max_memory = utils.parse_memory(cache_config.get("max_memory", FITNESS_CACHE_MAX_MEMORY), cache_name)
+            try:
+                cache_service = self.docker_master_client.services.create(
+                    image=cache_config.get("image", FITNESS_CACHE_IMAGE),
+                    command=[
+                        "redis-server",
+                        "--maxmemory", str(max_memory),
+                        "--maxmemory-policy", cache_config.get("policy", FITNESS_CACHE_POLICY),
+                        "--requirepass", secrets.token_hex(16),
+                        "--save", "",
+                        "--appendonly", "no",
+                    ],
+                    name=cache_name,
+                    hostname=cache_name,
+                    networks=[cache_network.name, "pga-management"],
+                    labels=cache_labels,
+                    endpoint_spec=self.__create_endpoint_spec(Orchestrator.fitness_cache_port),
+                    resources=self.__create_resources(utils.merge_dict(cache_config, {"name": cache_name})),
+                    **self.__create_placement(cache_config),
+                )
+            except docker.errors.APIError:
+                # Another PGA of the same problem may have created it concurrently.
+                cache_service = self.__find_fitness_cache_service(cache_name)
+                if cache_service is None:
+                    raise
+                logging.info("Fitness cache {} was created concurrently, reusing it.".format(cache_name))
+        self.__wait_for_service(service_name=cache_name)
+
+        return {
+            "key": cache_key,
+            "host": cache_name,
+            "network": cache_network.name,
+            "ttl": cache_config.get("ttl", FITNESS_CACHE_TTL),
+            "password": self.__get_fitness_cache_password(cache_service),
+        }
+
+    def __get_fitness_cache_password(self, cache_service):
+        # The password is part of the redis-server command of the cache service.
+        command = cache_service.attrs.get("Spec", {}).get("TaskTemplate", {}) \
+            .get("ContainerSpec", {}).get("Command") or []
+        if "--requirepass" in command[:-1]:
+            return command[command.index("--requirepass") + 1]
+        return None
+
+    def __create_endpoint_spec(self, target_port):
+        if not self.publish_ports:
+            return {
+                "Mode": "dnsrr"
+            }
+        # Publishes the port on the ingress network of every swarm node, i.e., reachable through the master host.
+        return {
+            "Mode": "vip",
+            "Ports": [{"Protocol": "tcp", "TargetPort": target_port}],
+        }
+
+    def __find_published_port(self, service, target_port):
+        # Retrieves the port the swarm published the given target port of the service on, if any.
+        service.reload()
+        for port in service.attrs.get("Endpoint", {}).get("Ports") or []:
+            if port.get("TargetPort") == target_port and port.get("PublishedPort"):
+                return port.get("PublishedPort")
+        return None
+
+    def __find_fitness_cache_service(self, cache_name):
+        # The name filter matches prefixes, hence the exact comparison.
+        for service in self.docker_master_client.services.list(filters={"name": cache_name}):
+            if service.name == cache_name:
+                return service
+        return None
+
+    def __find_fitness_cache_network(self, cache_name):
+        for network in self.docker_master_client.networks.list(names=[cache_name]):
+            if network.name == cache_name:
+                return network
+        return None
+
+    def __compute_fitness_cache_key(self, operators, file_names):
+        # Identifies the problem by the fitness image and the uploaded data configs.
+        fitness = None
+        for operator_key in [*operators]:
+            if operators.get(operator_key).get("name") == "fitness":
+                fitness = operators.get(operator_key)
+        if fitness is None:
+            raise Exception("No fitness operator found to attach the fitness cache to! Aborting deployment.")
+
+        digest = hashlib.sha256(fitness.get("image").encode("utf-8"))
+        stored_files_path = utils.get_uploaded_files_path(self.pga_id)
+        for file_name in sorted(file_names):
+            if file_name in ("config.yml", "population.yml"):
+                continue  # PGA specific, not part of the problem definition
+            digest.update(file_name.encode("utf-8"))
+            with open(os.path.join(stored_files_path, file_name), mode="rb") as file:
+                digest.update(file.read())
+        return digest.hexdigest()[:12]
+
+    def __get_fitness_cache_name(self, cache_key):
+        return "fitness-cache{sep_}{key_}".format(sep_=Orchestrator.name_separator, key_=cache_key)
+
+    def __find_fitness_cache_key(self):
+        # Retrieves the key of the fitness cache the fitness service of this PGA is attached to.
+        pga_filter = {"label": "PGAcloud=PGA-{id_}".format(id_=self.pga_id)}
+        for service in self.docker_master_client.services.list(filters=pga_filter):
+            cache_key = service.attrs.get("Spec", {}).get("Labels", {}).get(FITNESS_CACHE_LABEL)
+            if cache_key:
+                return cache_key
+        return None
+
+    def __remove_fitness_cache_if_unused(self, cache_key):
+        # Removes the fitness cache and its network once no PGA is attached to it anymore.
+        cache_user_filter = {"label": "{label_}={key_}".format(label_=FITNESS_CACHE_LABEL, key_=cache_key)}
+        cache_users = [*self.docker_master_client.services.list(filters=cache_user_filter),
+                       *self.docker_master_client.networks.list(filters=cache_user_filter)]
+        if cache_users.__len__() > 0:
+            logging.info("Fitness cache {key_} still used by {count_} services or PGA networks.".format(
+                key_=cache_key,
+                count_=cache_users.__len__(),
+            ))
+            return
+
+        cache_filter = {"label": "PGAcloud=fitness-cache-{key_}".format(key_=cache_key)}
+        for service in self.docker_master_client.services.list(filters=cache_filter):
+            service.remove()
+
+        cache_networks = self.docker_master_client.networks.list(filters=cache_filter)
+        timer = 0
+        start = time.perf_counter()
+        while cache_networks.__len__() > 0 and timer < WAIT_FOR_CONFIRMATION_DURATION:
+            for network in cache_networks:
+                try:
+                    network.remove()
+                except docker.errors.APIError:
+                    pass  # network still in use by the terminating cache service
+            time.sleep(WAIT_FOR_CONFIRMATION_SLEEP)  # avoid network overhead
+            cache_networks = self.docker_master_client.networks.list(filters=cache_filter)
+            timer = time.perf_counter() - start
+
+        if timer >= WAIT_FOR_CONFIRMATION_DURATION:
+            logging.info("We seem to have encountered an error when removing the fitness cache {}. "
+                         "Please verify or try again shortly.".format(cache_key))
+        else:
+            logging.info("Successfully removed unused fitness cache {}.".format(cache_key))
+
     def __update_service_with_configs(self, configs, service_name, container_config=None):
         # Updates the given service with the new configs.
         logging.info("Updating {name_} with docker configs.".format(name_=service_name))
@@ -318,3 +695,111 @@ class DockerOrchestrator(Orchestrator):
             param += container_config
             param += " --"
         return param
+
+
+def create_docker_client(host_ip, host_port, timeout=None):
+    tls_config = docker.tls.TLSConfig(
+        ca_cert="/run/secrets/SSL_CA_PEM",
+        client_cert=(
+            "/run/secrets/SSL_CERT_PEM",
+            "/run/secrets/SSL_KEY_PEM"
+        ),
+        verify=True
+    )
+    docker_client = docker.DockerClient(
+        base_url="tcp://{host_}:{port_}".format(
+            host_=host_ip,
+            port_=host_port
+        ),
+        tls=tls_config,
+        timeout=timeout or docker.constants.DEFAULT_TIMEOUT_SECONDS,
+    )
+    return docker_client
+
+
+def get_node_capacities(docker_client):
+    # Lists the active nodes of the swarm with their placement attributes and unreserved resources.
+    nodes = {}
+    for node in docker_client.nodes.list():
+        if node.attrs.get("Spec", {}).get("Availability") != "active" \
+                or node.attrs.get("Status", {}).get("State") != "ready":
+            continue
+        description = node.attrs.get("Description", {})
+        node_resources = description.get("Resources", {})
+        nodes[node.id] = {
+            "id": node.id,
+            "hostname": description.get("Hostname"),
+            "role": node.attrs.get("Spec", {}).get("Role"),
+            "labels": node.attrs.get("Spec", {}).get("Labels") or {},
+            "engine_labels": description.get("Engine", {}).get("Labels") or {},
+            "os": description.get("Platform", {}).get("OS"),
+            "arch": description.get("Platform", {}).get("Architecture"),
+            "total_nano_cpus": node_resources.get("NanoCPUs", 0),
+            "total_memory": node_resources.get("MemoryBytes", 0),
+            "free_nano_cpus": node_resources.get("NanoCPUs", 0),
+            "free_memory": node_resources.get("MemoryBytes", 0),
+        }
+
+    # Subtracts the reservations of the tasks already running on each node.
+    for task in docker_client.api.tasks(filters={"desired-state": "running"}):
+        node = nodes.get(task.get("NodeID"))
+        if node is None:
+            continue
+        reservations = task.get("Spec", {}).get("Resources", {}).get("Reservations", {})
+        node["free_nano_cpus"] -= reservations.get("NanoCPUs", 0)
+        node["free_memory"] -= reservations.get("MemoryBytes", 0)
+    return [*nodes.values()]
+
+
+def matches_constraint(node, constraint):
+    # Evaluates a docker placement constraint (e.g., "node.labels.zone==east") against a node capacity.
+    if "!=" in constraint:
+        key, value = [part.strip() for part in constraint.split("!=", 1)]
+        negated = True
+    elif "==" in constraint:
+        key, value = [part.strip() for part in constraint.split("==", 1)]
+        negated = False
+    else:
+        return True  # left for docker to validate
+
+    attributes = {
+        "node.id": node.get("id"),
+        "node.hostname": node.get("hostname"),
+        "node.role": node.get("role"),
+        "node.platform.os": node.get("os"),
+        "node.platform.arch": node.get("arch"),
+    }
+    if key in attributes:
+        actual = attributes.get(key)
+    elif key.startswith("node.labels."):
+        actual = node.get("labels").get(key[len("node.labels."):])
+    elif key.startswith("engine.labels."):
+        actual = node.get("engine_labels").get(key[len("engine.labels."):])
+    else:
+        logging.warning("Cannot verify unknown placement constraint {}.".format(constraint))
+        return True
+
+    return (actual == value) != negated
+
+
+def get_swarm_load(docker_client):
+    # Summarizes the nodes, the PGA services and the unreserved resources of the swarm.
+    # Reservations are counted per running task, which covers replicated and global services alike.
+    nodes = get_node_capacities(docker_client)
+
+    pga_services = 0
+    for service in docker_client.services.list(filters={"label": "PGAcloud"}):
+        labels = service.attrs.get("Spec", {}).get("Labels") or {}
+        if labels.get("PGAcloud", "").startswith("PGA-"):
+            pga_services += 1
+
+    return {
+        "nodes": nodes.__len__(),
+        "pga_services": pga_services,
+        "total_nano_cpus": sum(node.get("total_nano_cpus") for node in nodes),
+        "total_memory": sum(node.get("total_memory") for node in nodes),
+        "free_nano_cpus": sum(node.get("free_nano_cpus") for node in nodes),
+        "free_memory": sum(node.get("free_memory") for node in nodes),
+        "free_per_node": [{"nano_cpus": node.get("free_nano_cpus"), "memory": node.get("free_memory")}
+                          for node in nodes],
+    }
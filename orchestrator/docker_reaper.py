@@ -0,0 +1,138 @@
+import datetime
+import logging
+import time
+
+import docker
+
+from orchestrator.docker_orchestrator import DOCKER_CLIENT_TIMEOUT, FITNESS_CACHE_LABEL, create_docker_client
+
+REAPER_GRACE_PERIOD = 120.0  # seconds; resources younger than this may still be under construction
+REAPER_REMOVAL_SLEEP = 0.5  # seconds; rate limits removals to spare the swarm managers
+
+
+class DockerReaper:
+    def __init__(self, master_host):
+        self.host = master_host
+        self.docker_master_client = create_docker_client(
+            host_ip=master_host,
+            host_port=2376,
+            timeout=DOCKER_CLIENT_TIMEOUT,
+        )
+
+    def close(self):
+        self.docker_master_client.close()
+
+    def reap(self, reclaimable_pga_ids, active_pga_ids, batch_size):
+        # Removes the resources of at most batch_size failed or removed PGAs and of unused fitness caches.
+        # Resources of PGAs the manager has never seen are only reported, as they may belong to another manager.
+        # Returns the reclaimed resources, the labels of the unrecognized resource groups
+        # and the ids of all PGAs that still had resources on this swarm.
+        pga_filter = {"label": "PGAcloud"}
+        services = self.docker_master_client.services.list(filters=pga_filter)
+        configs = self.docker_master_client.configs.list(filters=pga_filter)
+        networks = self.docker_master_client.networks.list(filters=pga_filter)
+
+        groups = {}
+        for kind, resources in (("service", services), ("config", configs), ("network", networks)):
+            for resource in resources:
+                label = self.__get_labels(kind, resource).get("PGAcloud")
+                groups.setdefault(label, []).append((kind, resource))
+
+        # Caches are in use as long as a fitness service or a PGA network refers to them.
+        used_caches = set()
+        for kind, resources in (("service", services), ("network", networks)):
+            for resource in resources:
+                cache_key = self.__get_labels(kind, resource).get(FITNESS_CACHE_LABEL)
+                if cache_key:
+                    used_caches.add(cache_key)
+
+        present_pga_ids = {int(label[len("PGA-"):]) for label in groups
+                           if label.startswith("PGA-") and label[len("PGA-"):].isdigit()}
+
+        orphans = [label for label in sorted(groups)
+                   if self.__is_orphan(label, reclaimable_pga_ids, used_caches)
+                   and not self.__is_recent(groups.get(label))]
+        unrecognized = [label for label in sorted(groups)
+                        if self.__is_unrecognized(label, reclaimable_pga_ids, active_pga_ids)]
+        if unrecognized.__len__() > 0:
+            logging.info("Reaper left unrecognized resource groups on {host_} untouched: {labels_}".format(
+                host_=self.host,
+                labels_=unrecognized,
+            ))
+        if orphans.__len__() > 0:
+            logging.info("Reaper found {count_} orphaned resource groups on {host_}: {labels_}".format(
+                count_=orphans.__len__(),
+                host_=self.host,
+                labels_=orphans,
+            ))
+
+        reclaimed = []
+        for label in orphans[:batch_size]:
+            # Removes services before the configs and networks they depend on.
+            for kind in ("service", "config", "network"):
+                for resource_kind, resource in groups.get(label):
+                    if resource_kind != kind:
+                        continue
+                    if self.__remove(kind, resource):
+                        reclaimed.append({
+                            "kind": kind,
+                            "name": resource.name,
+                            "label": label,
+                            "master_host": self.host,
+                        })
+                    time.sleep(REAPER_REMOVAL_SLEEP)  # avoid flooding the swarm managers
+        return reclaimed, unrecognized, present_pga_ids
+
+    def __is_orphan(self, label, reclaimable_pga_ids, used_caches):
+        if label.startswith("PGA-"):
+            pga_id = label[len("PGA-"):]
+            return pga_id.isdigit() and int(pga_id) in reclaimable_pga_ids
+        elif label.startswith("fitness-cache-"):
+            return label[len("fitness-cache-"):] not in used_caches
+        return False  # not managed by the PGAcloud manager
+
+    def __is_unrecognized(self, label, reclaimable_pga_ids, active_pga_ids):
+        if label.startswith("PGA-"):
+            pga_id = label[len("PGA-"):]
+            return not pga_id.isdigit() \
+                or (int(pga_id) not in reclaimable_pga_ids and int(pga_id) not in active_pga_ids)
+        return not label.startswith("fitness-cache-")
+
+    def __is_recent(self, resources):
+        now = datetime.datetime.utcnow()
+        for kind, resource in resources:
+            if kind == "network":
+                created = resource.attrs.get("Created")
+            else:
+                created = resource.attrs.get("CreatedAt")
+            if not created:
+                continue
+            created_at = datetime.datetime.strptime(created[:19], "%Y-%m-%dT%H:%M:%S")
+            if (now - created_at).total_seconds() < REAPER_GRACE_PERIOD:
+                return True
+        return False
+
+    def __get_labels(self, kind, resource):
+        if kind == "network":
+            return resource.attrs.get("Labels") or {}
+        return resource.attrs.get("Spec", {}).get("Labels") or {}
+
+    def __remove(self, kind, resource):
+        try:
+            resource.remove()
+            logging.info("Reaper removed docker {kind_} {name_} on {host_}.".format(
+                kind_=kind,
+                name_=resource.name,
+                host_=self.host,
+            ))
+            return True
+        except docker.errors.NotFound:
+            return False  # already removed in the meantime
+        except docker.errors.APIError as e:
+            # Most likely still in use by a terminating service; retried in the next cycle.
+            logging.info("Reaper could not remove docker {kind_} {name_} yet: {error_}".format(
+                kind_=kind,
+                name_=resource.name,
+                error_=e,
+            ))
+            return False
@@ -2,12 +2,17 @@ import itertools
 import logging
 from abc import ABC, abstractmethod
 
+import redis
 import requests
 
+CACHE_TIMEOUT = 5  # seconds
+
 
 class Orchestrator(ABC):
     new_id = itertools.count().__next__
     name_separator = "--"
+    runner_port = 5000
+    fitness_cache_port = 6379
 
     def __init__(self, pga_id=None):
         if pga_id is None:
@@ -16,8 +21,9 @@ class Orchestrator(ABC):
             self.pga_id = pga_id
 
     @abstractmethod
-    def setup_pga(self, model, services, setups, operators, population, properties, file_names):
+    def setup_pga(self, model, services, setups, operators, population, properties, file_names, fitness_cache=None):
         # Creates and deploys all components required for a new PGA.
+        # Optionally attaches the fitness operator to a fitness cache shared by all PGAs solving the same problem.
         pass
 
     @abstractmethod
@@ -26,56 +32,91 @@ class Orchestrator(ABC):
         # raise Warning("Scaling aborted: Scaling of runner or manager services not permitted!")
         pass
 
+    @abstractmethod
+    def get_fitness_cache_stats(self):
+        # Retrieves the statistics of the fitness cache of the PGA, or None if it has no fitness cache.
+        pass
+
     @abstractmethod
     def remove_pga(self):
         # Removes the components of the PGA.
         pass
 
+    def get_runner_address(self):
+        # Address of the runner on the management network; orchestrators may expose it differently.
+        return "runner{sep_}{id_}:{port_}".format(
+            sep_=Orchestrator.name_separator,
+            id_=self.pga_id,
+            port_=Orchestrator.runner_port,
+        )
+
     def distribute_properties(self, properties):
+        url = "http://{address_}/{id_}/properties".format(address_=self.get_runner_address(), id_=self.pga_id)
         response = requests.put(
-            url="http://runner{sep_}{id_}:5000/{id_}/properties".format(
-                sep_=Orchestrator.name_separator,
-                id_=self.pga_id
-            ),
+            url=url,
             data=properties,
             verify=False
         )
-        logging.info("PUT - http://runner{sep_}{id_}:5000/{id_}/properties - {status_}".format(
-            sep_=Orchestrator.name_separator,
-            id_=self.pga_id,
+        logging.info("PUT - {url_} - {status_}".format(
+            url_=url,
             status_=response.status_code,
         ))
 
     def initialize_population(self, population):
+        url = "http://{address_}/{id_}/population".format(address_=self.get_runner_address(), id_=self.pga_id)
         response = requests.post(
-            url="http://runner{sep_}{id_}:5000/{id_}/population".format(
-                sep_=Orchestrator.name_separator,
-                id_=self.pga_id
-            ),
+            url=url,
             data=population,
             verify=False
         )
-        logging.info("POST - http://runner{sep_}{id_}:5000/{id_}/population - {status_}".format(
-            sep_=Orchestrator.name_separator,
-            id_=self.pga_id,
+        logging.info("POST - {url_} - {status_}".format(
+            url_=url,
             status_=response.status_code,
         ))
 
     def start_pga(self):
         return requests.put(
-            url="http://runner{sep_}{id_}:5000/{id_}/start".format(
-                sep_=Orchestrator.name_separator,
-                id_=self.pga_id
-            ),
+            url="http://{address_}/{id_}/start".format(address_=self.get_runner_address(), id_=self.pga_id),
             verify=False
         )
 
     def stop_pga(self):
         response = requests.put(
-            url="http://runner{sep_}{id_}:5000/stop".format(
-                sep_=Orchestrator.name_separator,
-                id_=self.pga_id
-            ),
+            url="http://{address_}/stop".format(address_=self.get_runner_address()),
             verify=False
         )
         return response.status_code
+
+    def fetch_cache_stats(self, cache_host, cache_port=fitness_cache_port, password=None):
+        # Returns None if the cache is unreachable, e.g., because it is still starting up.
+        cache = redis.Redis(
+            host=cache_host,
+            port=cache_port,
+            password=password,
+            socket_connect_timeout=CACHE_TIMEOUT,
+            socket_timeout=CACHE_TIMEOUT,
+        )
+        try:
+            stats = cache.info(section="stats")
+            memory = cache.info(section="memory")
+            entries = cache.dbsize()
+        except redis.exceptions.RedisError as e:
+            logging.warning("Fitness cache {host_}:{port_} is unavailable: {error_}".format(
+                host_=cache_host,
+                port_=cache_port,
+                error_=e,
+            ))
+            return None
+        hits = stats.get("keyspace_hits", 0)
+        misses = stats.get("keyspace_misses", 0)
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups > 0 else 0.0,
+            "evicted": stats.get("evicted_keys", 0),
+            "expired": stats.get("expired_keys", 0),
+            "used_memory": memory.get("used_memory", 0),
+            "max_memory": memory.get("maxmemory", 0),
+        }
@@ -52,12 +52,71 @@ def merge_dict(dict1, dict2):
     return res
 
 
+def parse_cpus(cpus, component=None):
+    # Converts a number of CPUs (e.g., 0.5) into nano CPUs as expected by docker.
+    if cpus is None:
+        return None
+    try:
+        nano_cpus = int(float(cpus) * 1e9)
+    except (TypeError, ValueError, OverflowError):
+        nano_cpus = -1
+    if nano_cpus < 0:
+        raise Exception("Invalid CPU value '{value_}' for component {name_}! Aborting deployment.".format(
+            value_=cpus,
+            name_=component,
+        ))
+    return nano_cpus
+
+
+def parse_memory(memory, component=None):
+    # Converts a memory size (e.g., 536870912, "256k", "512M", "1GB" or "2Gi") into bytes.
+    if memory is None:
+        return None
+    units = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    value = str(memory).strip().lower()
+    if value.endswith("b"):
+        value = value[:-1]
+    if value.endswith("i") and value[-2:-1] in ("k", "m", "g"):
+        value = value[:-1]
+    unit = value[-1:] if value[-1:] in units else ""
+    try:
+        memory_bytes = int(float(value[:len(value) - len(unit)]) * units[unit])
+    except (ValueError, OverflowError):
+        memory_bytes = -1
+    if memory_bytes < 0:
+        raise Exception("Invalid memory value '{value_}' for component {name_}! Aborting deployment.".format(
+            value_=memory,
+            name_=component,
+        ))
+    return memory_bytes
+
+
+def get_fitness_cache_config(configuration):
+    # Returns the fitness cache block of a PGA configuration, or None if it is absent or disabled.
+    cache_config = configuration.get("fitness_cache")
+    if cache_config is None or cache_config is False:
+        return None
+    if not isinstance(cache_config, dict):
+        raise Exception("Invalid fitness_cache configuration '{}', expected a mapping! Aborting deployment.".format(
+            cache_config
+        ))
+    if not cache_config.get("enabled", True):
+        return None
+    return cache_config
+
+
 def parse_yaml(yaml_file_path):
     with open(yaml_file_path, mode="r", encoding="utf-8") as yaml_file:
         content = yaml.safe_load(yaml_file) or {}
     return content
 
 
+def parse_yaml_stream(yaml_stream):
+    content = yaml.safe_load(yaml_stream) or {}
+    yaml_stream.seek(0)  # allow the stream to be read again, e.g., to be saved
+    return content
+
+
 # --- File and path handling commands ---
 def get_uploaded_files_path(pga_id):
     return os.path.join(files_dir, str(pga_id))